@@ -1,19 +1,58 @@
+import functools
+import glob
+import hashlib
 import os
 import re
 import shutil
+import subprocess
 import tempfile
-import urllib.parse
-from difflib import SequenceMatcher
-from typing import Optional
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+from typing import Callable, Iterator, Optional
 
 import requests
 import yt_dlp
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from pydub import AudioSegment
+from requests.adapters import HTTPAdapter
 
-app = FastAPI(title="Set Decoder API")
+try:
+    from rapidfuzz.fuzz import ratio as similarity_ratio
+except ImportError:
+    # Fallback para deploys sin rapidfuzz: cdifflib es difflib implementado en C
+    try:
+        from cdifflib import CSequenceMatcher as SequenceMatcher
+    except ImportError:
+        from difflib import SequenceMatcher
+
+    def similarity_ratio(s1: str, s2: str) -> float:
+        """Similitud entre 0 y 100, igual que rapidfuzz.fuzz.ratio"""
+        return SequenceMatcher(None, s1, s2).ratio() * 100
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Workers propios para los jobs, separados del threadpool de FastAPI
+    app.state.job_executor = ThreadPoolExecutor(
+        max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="set-job"
+    )
+    yield
+    # Al apagar: descartar jobs en cola y hacer que los que corren se detengan
+    app.state.job_executor.shutdown(wait=False, cancel_futures=True)
+    with jobs_lock:
+        jobs.clear()
+
+
+app = FastAPI(
+    title="Set Decoder API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS para el frontend
 app.add_middleware(
@@ -27,10 +66,25 @@ app.add_middleware(
 # Config
 AUDD_API_TOKEN = "42d4de912f5b46ba837f61ed431587bc"
 SEGMENT_DURATION = 30  # segundos entre cada sample
-SAMPLE_LENGTH = 15  # segundos de audio para identificar
+COARSE_STRIDE = 90  # segundos entre samples en la primera pasada (~track mínimo)
+RECENT_TRACKS = 3  # tracks anteriores contra los que se busca duplicados
+MAX_WORKERS = 8  # requests simultáneos a AudD por job
+JOB_TTL = 3600  # segundos que se guarda un job desde su última actualización
+MAX_CONCURRENT_JOBS = 2  # sets procesándose a la vez, el resto queda en cola
+PROGRESS_EVERY = 4  # segmentos entre actualizaciones de progreso
+COARSE_LOOKAHEAD = 2 * MAX_WORKERS  # muestras gruesas encoladas por adelantado
+
+# Sesión HTTP compartida entre threads (reutiliza conexiones a AudD). El pool
+# tiene una conexión por thread de todos los jobs, así ninguna se descarta y no
+# se repite el handshake TLS en cada segmento
+audd_session = requests.Session()
+audd_session.mount(
+    "https://", HTTPAdapter(pool_maxsize=MAX_WORKERS * MAX_CONCURRENT_JOBS)
+)
 
-# Storage de jobs en memoria (para demo)
-jobs = {}
+# Storage de jobs en memoria (para demo), expiran solos después de JOB_TTL
+jobs = TTLCache(maxsize=1024, ttl=JOB_TTL)
+jobs_lock = threading.Lock()
 
 
 class SetRequest(BaseModel):
@@ -50,24 +104,17 @@ class Track(BaseModel):
     status: str = "identified"
 
 
-def clean_youtube_url(url: str) -> str:
-    """Limpia la URL de YouTube removiendo parámetros de playlist/radio"""
-    parsed = urllib.parse.urlparse(url)
-
-    # Si es YouTube, extraer solo el video ID
-    if "youtube.com" in parsed.netloc or "youtu.be" in parsed.netloc:
-        query_params = urllib.parse.parse_qs(parsed.query)
-
-        # Obtener el video ID
-        video_id = query_params.get("v", [None])[0]
+# Video ID de YouTube en URLs watch?v= o youtu.be/
+_YOUTUBE_ID_RE = re.compile(
+    r"(?:youtube\.com/watch\?(?:[^&#]*&)*v=|youtu\.be/)([\w-]{11})"
+)
 
-        if video_id:
-            return f"https://www.youtube.com/watch?v={video_id}"
 
-        # Para youtu.be/VIDEO_ID
-        if "youtu.be" in parsed.netloc:
-            video_id = parsed.path.strip("/")
-            return f"https://www.youtube.com/watch?v={video_id}"
+def clean_youtube_url(url: str) -> str:
+    """Limpia la URL de YouTube removiendo parámetros de playlist/radio"""
+    match = _YOUTUBE_ID_RE.search(url)
+    if match:
+        return f"https://www.youtube.com/watch?v={match.group(1)}"
 
     return url
 
@@ -82,6 +129,39 @@ def format_timestamp(seconds: int) -> str:
     return f"{minutes:02d}:{secs:02d}"
 
 
+# Palabras comunes de remixes que no sirven para comparar tracks
+REMOVE_WORDS = [
+    "remix",
+    "edit",
+    "bootleg",
+    "mix",
+    "version",
+    "extended",
+    "original",
+    "radio",
+    "club",
+    "dub",
+    "instrumental",
+    "vip",
+    "flip",
+    "rework",
+    "remaster",
+    "remastered",
+    "feat",
+    "ft",
+    "featuring",
+    "prod",
+    "produced",
+]
+
+# Regex precompiladas para normalize_track_name
+_BRACKETS_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_REMOVE_WORDS_RE = re.compile(r"\b(?:" + "|".join(REMOVE_WORDS) + r")\b")
+_NONWORD_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
 def normalize_track_name(artist: str, title: str) -> str:
     """Normaliza el nombre para comparar tracks similares"""
     if not artist or not title:
@@ -92,53 +172,52 @@ def normalize_track_name(artist: str, title: str) -> str:
     title = title.lower().strip()
 
     # Remover contenido entre paréntesis y corchetes (remixes, edits, etc)
-    title = re.sub(r"\([^)]*\)", "", title)
-    title = re.sub(r"\[[^\]]*\]", "", title)
+    title = _BRACKETS_RE.sub("", title)
 
     # Remover palabras comunes de remixes
-    remove_words = [
-        "remix",
-        "edit",
-        "bootleg",
-        "mix",
-        "version",
-        "extended",
-        "original",
-        "radio",
-        "club",
-        "dub",
-        "instrumental",
-        "vip",
-        "flip",
-        "rework",
-        "remaster",
-        "remastered",
-        "feat",
-        "ft",
-        "featuring",
-        "prod",
-        "produced",
-    ]
-    for word in remove_words:
-        title = re.sub(rf"\b{word}\b", "", title)
-        artist = re.sub(rf"\b{word}\b", "", artist)
+    title = _REMOVE_WORDS_RE.sub("", title)
+    artist = _REMOVE_WORDS_RE.sub("", artist)
 
     # Remover caracteres especiales y espacios extra
-    title = re.sub(r"[^\w\s]", "", title)
-    artist = re.sub(r"[^\w\s]", "", artist)
-    title = " ".join(title.split())
-    artist = " ".join(artist.split())
+    title = _NONWORD_RE.sub("", title)
+    artist = _NONWORD_RE.sub("", artist)
+    title = _WS_RE.sub(" ", title).strip()
+    artist = _WS_RE.sub(" ", artist).strip()
 
     return f"{artist} - {title}"
 
 
+@functools.lru_cache(maxsize=1024)
+def track_ngrams(text: str) -> frozenset:
+    """Trigramas de caracteres de un nombre normalizado"""
+    return frozenset(text[i : i + 3] for i in range(len(text) - 2))
+
+
+def ngram_similarity(text1: str, text2: str) -> float:
+    """Índice de Jaccard entre los trigramas de dos nombres normalizados"""
+    ngrams1 = track_ngrams(text1)
+    ngrams2 = track_ngrams(text2)
+    return len(ngrams1 & ngrams2) / max(1, len(ngrams1 | ngrams2))
+
+
 def tracks_are_similar(
     track1_artist: str, track1_title: str, track2_artist: str, track2_title: str
 ) -> bool:
     """Compara si dos tracks son esencialmente el mismo tema"""
+    if not (track1_artist and track1_title and track2_artist and track2_title):
+        return False
+
+    # AudD devolvió exactamente el mismo track (caso más común entre segmentos)
+    if (track1_artist, track1_title) == (track2_artist, track2_title):
+        return True
+
     norm1 = normalize_track_name(track1_artist, track1_title)
     norm2 = normalize_track_name(track2_artist, track2_title)
+    return names_are_similar(norm1, norm2)
 
+
+def names_are_similar(norm1: str, norm2: str) -> bool:
+    """Compara dos nombres ya normalizados con normalize_track_name"""
     if not norm1 or not norm2:
         return False
 
@@ -146,17 +225,27 @@ def tracks_are_similar(
     if norm1 == norm2:
         return True
 
-    # Si tienen alta similitud (>80%)
-    similarity = SequenceMatcher(None, norm1, norm2).ratio()
-    if similarity > 0.8:
-        return True
-
     # Comparar solo el título (a veces el artista varía)
     title1 = norm1.split(" - ")[-1] if " - " in norm1 else norm1
     title2 = norm2.split(" - ")[-1] if " - " in norm2 else norm2
 
-    title_similarity = SequenceMatcher(None, title1, title2).ratio()
-    if title_similarity > 0.85:
+    # Prefiltro por trigramas: descarta o acepta sin calcular ratios. Un nombre
+    # o título de menos de 3 caracteres no tiene trigramas, así que no se
+    # descarta por ese lado y se compara con los ratios
+    jaccard = ngram_similarity(norm1, norm2)
+    if jaccard > 0.9:
+        return True
+    has_ngrams = min(len(norm1), len(norm2), len(title1), len(title2)) >= 3
+    if has_ngrams and jaccard < 0.3 and ngram_similarity(title1, title2) < 0.3:
+        return False
+
+    # Si tienen alta similitud (>80%)
+    similarity = similarity_ratio(norm1, norm2)
+    if similarity > 80:
+        return True
+
+    title_similarity = similarity_ratio(title1, title2)
+    if title_similarity > 85:
         return True
 
     return False
@@ -164,16 +253,10 @@ def tracks_are_similar(
 
 def download_audio(url: str, output_path: str) -> dict:
     """Descarga audio de YouTube/SoundCloud"""
+    # Sin postprocesado: AudD acepta el audio original (m4a/webm/mp3)
     ydl_opts = {
-        "format": "bestaudio/best",
-        "postprocessors": [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "192",
-            }
-        ],
-        "outtmpl": output_path,
+        "format": "bestaudio[ext=m4a]/bestaudio/best",
+        "outtmpl": output_path + ".%(ext)s",
         "quiet": True,
         "no_warnings": True,
         "noplaylist": True,  # Solo descargar el video, no la playlist
@@ -185,6 +268,7 @@ def download_audio(url: str, output_path: str) -> dict:
             "title": info.get("title", "Unknown"),
             "duration": info.get("duration", 0),
             "uploader": info.get("uploader", "Unknown"),
+            "filepath": info["requested_downloads"][0]["filepath"],
         }
 
 
@@ -194,7 +278,7 @@ def identify_segment(audio_path: str) -> dict:
         with open(audio_path, "rb") as f:
             data = {"api_token": AUDD_API_TOKEN, "return": "spotify,apple_music,deezer"}
             files = {"file": f}
-            response = requests.post(
+            response = audd_session.post(
                 "https://api.audd.io/", data=data, files=files, timeout=30
             )
             result = response.json()
@@ -234,75 +318,269 @@ def identify_segment(audio_path: str) -> dict:
         return {"found": False, "error": str(e)}
 
 
+def probe_duration(audio_file: str) -> int:
+    """Obtiene la duración en segundos leyendo solo el header con ffprobe"""
+    output = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            audio_file,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return int(float(output.strip()))
+
+
+def split_audio(audio_file: str, temp_dir: str, segment_duration: int) -> list:
+    """Corta el set en segmentos con una sola llamada a ffmpeg (stream copy)"""
+    ext = os.path.splitext(audio_file)[1]
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-i",
+            audio_file,
+            "-vn",
+            "-c",
+            "copy",
+            "-f",
+            "segment",
+            "-segment_time",
+            str(segment_duration),
+            "-reset_timestamps",
+            "1",
+            "-y",
+            os.path.join(temp_dir, f"segment_%05d{ext}"),
+        ],
+        check=True,
+        stderr=subprocess.DEVNULL,
+    )
+    return sorted(glob.glob(os.path.join(temp_dir, f"segment_*{ext}")))
+
+
+def identify_at(segment_path: str, i: int, start_time: int, cache: dict) -> tuple:
+    """Identifica el segmento que empieza en start_time"""
+    # Reusar la respuesta de AudD si ya se identificó el mismo audio en este job
+    with open(segment_path, "rb") as f:
+        segment_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    result = cache.get(segment_hash)
+    if result is None:
+        # Identificar
+        result = identify_segment(segment_path)
+        if "error" not in result:
+            cache[segment_hash] = result
+
+    # Limpiar archivo temporal
+    os.remove(segment_path)
+
+    return i, start_time, result
+
+
+def identify_segments(
+    executor: ThreadPoolExecutor,
+    segment_paths: list,
+    segment_duration: int,
+    cache: dict,
+    should_stop: Callable[[], bool],
+) -> Iterator[Future]:
+    """Identifica los segmentos con stride adaptativo y genera los futures en orden
+
+    Primero se identifica un segmento cada ~COARSE_STRIDE segundos. Entre dos
+    muestras que no son el mismo track (cambio de tema o no encontrado) se
+    identifican además todos los segmentos intermedios. Cada par de muestras se
+    resuelve a medida que vuelve, así los resultados se procesan en vivo.
+    """
+    total_segments = len(segment_paths)
+    if not total_segments:
+        return
+
+    stride = max(1, min(COARSE_STRIDE, 3 * segment_duration) // segment_duration)
+    coarse = list(range(0, total_segments, stride))
+    if coarse[-1] != total_segments - 1:
+        coarse.append(total_segments - 1)
+
+    def submit(i: int) -> Future:
+        return executor.submit(
+            identify_at, segment_paths[i], i, i * segment_duration, cache
+        )
+
+    def wait_for(future: Future) -> bool:
+        """Espera una muestra revisando si hay que cancelar el job"""
+        while not future.done():
+            if should_stop():
+                return False
+            wait([future], timeout=1)
+        return True
+
+    futures = {}
+    pairs = list(zip(coarse, coarse[1:]))
+    planned = 0
+
+    def submit_coarse():
+        """Manda muestras gruesas solo hasta COARSE_LOOKAHEAD después del par actual
+
+        Así los segmentos intermedios de los pares ya resueltos entran al pool
+        antes que el resto de la pasada gruesa y el progreso avanza en vivo.
+        """
+        for i in coarse[len(futures) : planned + 2 + COARSE_LOOKAHEAD]:
+            futures[i] = submit(i)
+
+    submit_coarse()
+    pending = deque()
+    while planned < len(pairs) or pending:
+        # Planificar todos los pares cuyas muestras ya volvieron (así el pool no
+        # se queda sin trabajo); si no hay nada para devolver, esperar al próximo
+        while planned < len(pairs):
+            submit_coarse()
+            a, b = pairs[planned]
+            if pending and not (futures[a].done() and futures[b].done()):
+                break
+            if not (wait_for(futures[a]) and wait_for(futures[b])):
+                return
+
+            pending.append(futures[a])
+            result_a = futures[a].result()[2]
+            result_b = futures[b].result()[2]
+            same_track = (
+                result_a.get("found")
+                and result_b.get("found")
+                and tracks_are_similar(
+                    result_a.get("artist", ""),
+                    result_a.get("title", ""),
+                    result_b.get("artist", ""),
+                    result_b.get("title", ""),
+                )
+            )
+            if not same_track:
+                pending.extend(submit(i) for i in range(a + 1, b))
+            planned += 1
+
+        yield pending.popleft()
+
+    yield futures[coarse[-1]]
+
+
+def update_job(job_id: str, **fields) -> bool:
+    """Actualiza los campos de un job y renueva su TTL"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return False
+        jobs[job_id] = job
+
+    with job["_lock"]:
+        job.update(fields)
+    return True
+
+
+def job_exists(job_id: str) -> bool:
+    """Indica si el job sigue guardado (no fue eliminado ni expiró)"""
+    with jobs_lock:
+        return job_id in jobs
+
+
 def process_set(job_id: str, url: str, segment_duration: int = 30):
     """Procesa un set completo"""
     temp_dir = tempfile.mkdtemp()
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
     try:
-        jobs[job_id]["status"] = "downloading"
-        jobs[job_id]["message"] = "Descargando audio..."
+        # Si el job fue eliminado o expiró en cualquier punto, dejar de procesar
+        # (así no se gastan requests de AudD en un job que nadie va a leer)
+        if not update_job(job_id, status="downloading", message="Descargando audio..."):
+            return
 
         # Descargar audio
         audio_base = os.path.join(temp_dir, "audio")
         info = download_audio(url, audio_base)
-        audio_file = audio_base + ".mp3"
+        audio_file = info.pop("filepath")
 
         # Verificar que el archivo existe
         if not os.path.exists(audio_file):
             raise Exception(f"Audio file not found: {audio_file}")
 
-        jobs[job_id]["set_info"] = info
-        jobs[job_id]["status"] = "processing"
-        jobs[job_id]["message"] = "Procesando audio..."
+        if not update_job(
+            job_id,
+            set_info=info,
+            status="processing",
+            message="Procesando audio...",
+        ):
+            return
 
-        # Cargar audio
-        audio = AudioSegment.from_mp3(audio_file)
-        duration_seconds = len(audio) // 1000
+        # Duración según yt-dlp (sin cargar el audio en memoria)
+        duration_seconds = int(info["duration"] or probe_duration(audio_file))
 
-        jobs[job_id]["total_duration"] = duration_seconds
-        jobs[job_id][
-            "message"
-        ] = f"Identificando tracks (0/{duration_seconds // segment_duration})..."
+        segment_paths = split_audio(audio_file, temp_dir, segment_duration)
+        total_segments = len(segment_paths)
+        message_template = "Identificando tracks ({}/" + str(total_segments) + ")..."
+
+        if not update_job(
+            job_id,
+            total_duration=duration_seconds,
+            message=message_template.format(0),
+        ):
+            return
 
         tracks = []
         last_track = None
+        recent_names = deque(maxlen=RECENT_TRACKS)
+        seen_names = set()
         consecutive_not_found = 0
 
-        # Procesar cada segmento
-        for i, start_time in enumerate(range(0, duration_seconds, segment_duration)):
-            jobs[job_id]["current_position"] = start_time
-            jobs[job_id][
-                "message"
-            ] = f"Identificando tracks ({i + 1}/{duration_seconds // segment_duration + 1})..."
-
-            # Extraer segmento
-            start_ms = start_time * 1000
-            end_ms = min(start_ms + (SAMPLE_LENGTH * 1000), len(audio))
-            segment = audio[start_ms:end_ms]
-
-            # Guardar segmento temporal
-            segment_path = os.path.join(temp_dir, f"segment_{i}.mp3")
-            segment.export(segment_path, format="mp3")
-
-            # Identificar
-            result = identify_segment(segment_path)
-
-            # Limpiar archivo temporal
-            os.remove(segment_path)
+        # Identificar los segmentos en paralelo (el cuello de botella es AudD)
+        futures = identify_segments(
+            executor,
+            segment_paths,
+            segment_duration,
+            {},
+            lambda: not job_exists(job_id),
+        )
+
+        # Procesar los resultados en orden para que el dedup sea determinístico
+        for n, future in enumerate(futures):
+            i, start_time, result = future.result()
+            if not job_exists(job_id):
+                return
+
+            # El progreso se publica cada PROGRESS_EVERY segmentos
+            if n % PROGRESS_EVERY == 0 or i == total_segments - 1:
+                update_job(
+                    job_id,
+                    current_position=start_time,
+                    message=message_template.format(i + 1),
+                )
 
             if result.get("found"):
                 current_artist = result.get("artist", "")
                 current_title = result.get("title", "")
 
-                # Verificar si es similar al último track
-                is_similar = False
-                if last_track and last_track.get("status") == "identified":
-                    is_similar = tracks_are_similar(
-                        last_track.get("artist", ""),
-                        last_track.get("title", ""),
-                        current_artist,
-                        current_title,
+                # Verificar si es similar a alguno de los últimos tracks
+                # (AudD a veces alterna entre dos temas que se mezclan)
+                current_name = normalize_track_name(current_artist, current_title)
+
+                # Nombre ya visto en el job y que es el último track listado: es
+                # el mismo tema sonando, no hace falta la comparación fuzzy. Un
+                # nombre nuevo o una repetición después de otro tema / un hueco
+                # sigue por la comparación fuzzy
+                if (
+                    current_name in seen_names
+                    and recent_names
+                    and current_name == recent_names[-1]
+                ):
+                    is_similar = True
+                else:
+                    is_similar = any(
+                        names_are_similar(name, current_name) for name in recent_names
                     )
+                if current_name:
+                    seen_names.add(current_name)
 
                 if not is_similar:
                     new_track = {
@@ -318,6 +596,8 @@ def process_set(job_id: str, url: str, segment_duration: int = 30):
                     }
                     tracks.append(new_track)
                     last_track = new_track
+                    recent_names.append(current_name)
+                    update_job(job_id, tracks=list(tracks))
                     consecutive_not_found = 0
 
             else:
@@ -337,22 +617,21 @@ def process_set(job_id: str, url: str, segment_duration: int = 30):
                     }
                     tracks.append(new_track)
                     last_track = new_track
+                    recent_names.clear()
+                    update_job(job_id, tracks=list(tracks))
 
-            jobs[job_id]["tracks"] = tracks
-
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["message"] = "Completado!"
+        update_job(job_id, status="completed", message="Completado!")
 
     except Exception as e:
         print(f"[Error] {e}")
-        jobs[job_id]["status"] = "error"
-        jobs[job_id]["message"] = f"Error: {str(e)}"
+        update_job(job_id, status="error", message=f"Error: {str(e)}")
     finally:
+        executor.shutdown(cancel_futures=True)
         shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 @app.post("/api/identify")
-async def identify_set(request: SetRequest, background_tasks: BackgroundTasks):
+async def identify_set(request: SetRequest):
     """Inicia la identificación de un set"""
     import uuid
 
@@ -361,17 +640,19 @@ async def identify_set(request: SetRequest, background_tasks: BackgroundTasks):
     # Limpiar la URL (remover parámetros de playlist/radio)
     clean_url = clean_youtube_url(request.url)
 
-    jobs[job_id] = {
-        "status": "queued",
-        "message": "En cola...",
-        "url": clean_url,
-        "tracks": [],
-        "set_info": None,
-        "total_duration": 0,
-        "current_position": 0,
-    }
+    with jobs_lock:
+        jobs[job_id] = {
+            "status": "queued",
+            "message": "En cola...",
+            "url": clean_url,
+            "tracks": [],
+            "set_info": None,
+            "total_duration": 0,
+            "current_position": 0,
+            "_lock": threading.Lock(),
+        }
 
-    background_tasks.add_task(
+    app.state.job_executor.submit(
         process_set, job_id, clean_url, request.segment_duration or 30
     )
 
@@ -381,9 +662,24 @@ async def identify_set(request: SetRequest, background_tasks: BackgroundTasks):
 @app.get("/api/status/{job_id}")
 async def get_status(job_id: str):
     """Obtiene el estado de un job"""
-    if job_id not in jobs:
+    with jobs_lock:
+        job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Copia superficial: la lista de tracks se reemplaza, nunca se muta
+    with job["_lock"]:
+        return {key: value for key, value in job.items() if key != "_lock"}
+
+
+@app.delete("/api/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Elimina un job (si sigue corriendo, se cancela)"""
+    with jobs_lock:
+        job = jobs.pop(job_id, None)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return jobs[job_id]
+    return {"status": "deleted"}
 
 
 @app.get("/api/health")